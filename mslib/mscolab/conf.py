@@ -60,6 +60,13 @@ class default_mscolab_settings:
     # mscolab data directory
     MSCOLAB_DATA_DIR = os.path.join(DATA_DIR, 'filedata')
 
+    # flush saved operation files to disk (fsync) before they replace the previous version
+    SYNC_WRITES = False
+
+    # seconds to wait before a saved operation gets committed to its history, further saves in this time
+    # are committed together with it. With 0 every save is committed at once.
+    COMMIT_DELAY = 0
+
     # MYSQL CONNECTION STRING: "mysql+pymysql://<username>:<password>@<host>:<port>/<db_name>?charset=utf8mb4"
     SQLALCHEMY_DB_URI = 'sqlite:///' + os.path.join(DATA_DIR, 'mscolab.db')
 
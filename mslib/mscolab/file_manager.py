@@ -26,19 +26,127 @@
 """
 import datetime
 import fs
-import difflib
+import functools
+import getpass
 import logging
+import os
+import pathlib
+import re
+import shutil
+import socket
+import subprocess
+import threading
 import git
+from collections import OrderedDict, defaultdict
+from flask import current_app, g, has_app_context
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import joinedload
 from mslib.mscolab.models import db, Operation, Permission, User, Change, Message
 from mslib.mscolab.conf import mscolab_settings
 
+CHANGE_TIME_FORMAT = "%Y-%m-%d, %H:%M:%S"
+# operation paths are directory names, no separators and no whitespace
+INVALID_PATH_CHARS = re.compile(r"[/\\\s]")
+# number of operation repositories whose git.Repo handle and "git cat-file" process are kept
+REPO_CACHE_SIZE = 128
+
 
 class FileManager:
     """Class with handler functions for file related functionalities"""
 
     def __init__(self, data_dir):
         self.data_dir = data_dir
+        self._root = pathlib.Path(data_dir)
+        # one long running "git cat-file --batch" per recently used operation repository, see _show_file
+        self._cat_file_procs = OrderedDict()
+        self._cat_file_lock = threading.Lock()
+        # git.Repo handles of the recently used operation repositories
+        self._repo_cache = functools.lru_cache(maxsize=REPO_CACHE_SIZE)(self._open_repo)
+        # op_id: (timer, app, u_id) of saves waiting to be committed, see mscolab_settings.COMMIT_DELAY
+        self._pending_commits = {}
+        self._commit_lock = threading.RLock()
+
+    def close(self):
+        """
+        commits pending saves and stops the git processes started by this instance
+        """
+        self.flush()
+        with self._cat_file_lock:
+            for operation_path in list(self._cat_file_procs):
+                self._stop_cat_file(operation_path)
+        self._repo_cache.cache_clear()
+
+    def _open_repo(self, operation_path, repo_id):
+        """
+        operation_path: directory of the operation repository
+        repo_id: identity of the repository, only used as part of the cache key
+        """
+        return git.Repo(operation_path)
+
+    def _repo(self, operation_path):
+        """
+        operation_path: directory of the operation repository
+
+        returns the cached git.Repo, a repository created again at the same path gets a new handle
+        """
+        # .git/config is written once by "git init"
+        config = os.stat(os.path.join(operation_path, ".git", "config"))
+        return self._repo_cache(operation_path, (config.st_ino, config.st_ctime_ns))
+
+    def _forget_repo(self, operation_path):
+        """
+        operation_path: directory of the operation repository
+
+        drops the cached handles of a repository which gets moved, removed or created
+        """
+        with self._cat_file_lock:
+            self._stop_cat_file(operation_path)
+        # lru_cache can not forget a single entry
+        self._repo_cache.cache_clear()
+
+    def _stop_cat_file(self, operation_path):
+        """
+        operation_path: directory of the operation repository
+        """
+        proc = self._cat_file_procs.pop(operation_path, None)
+        if proc is not None:
+            proc.stdin.close()
+            proc.stdout.close()
+            proc.wait()
+
+    def _show_file(self, operation_path, commit_hash, retry=True):
+        """
+        operation_path: directory of the operation repository
+        commit_hash: commit to read main.ftml from
+
+        returns the content of main.ftml at that commit, like "git show <commit_hash>:main.ftml"
+        """
+        with self._cat_file_lock:
+            proc = self._cat_file_procs.get(operation_path)
+            if proc is None or proc.poll() is not None:
+                self._stop_cat_file(operation_path)
+                proc = subprocess.Popen(["git", "cat-file", "--batch"], cwd=operation_path,
+                                        stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+                self._cat_file_procs[operation_path] = proc
+                # same bound as the git.Repo handles, the least recently used process is stopped
+                if len(self._cat_file_procs) > REPO_CACHE_SIZE:
+                    self._stop_cat_file(next(iter(self._cat_file_procs)))
+            else:
+                self._cat_file_procs.move_to_end(operation_path)
+            try:
+                proc.stdin.write(f"{commit_hash}:main.ftml\n".encode("utf-8"))
+                proc.stdin.flush()
+                header = proc.stdout.readline().split()
+                if len(header) == 3 and header[1] == b"blob":
+                    content = proc.stdout.read(int(header[2]) + 1)[:-1]
+                    return content.decode("utf-8").removesuffix("\n")
+            except (OSError, ValueError) as ex:
+                logging.debug(ex)
+            # the process may still see a repository which was removed and created again
+            self._stop_cat_file(operation_path)
+        if retry:
+            return self._show_file(operation_path, commit_hash, retry=False)
+        raise ValueError(f"main.ftml of {commit_hash} not found in {operation_path}")
 
     def create_operation(self, path, description, user, last_used=None, content=None, category="default", active=True):
         """
@@ -46,7 +154,7 @@ class FileManager:
         description: description of the operation
         """
         # set codes on these later
-        if path.find("/") != -1 or path.find("\\") != -1 or (" " in path):
+        if INVALID_PATH_CHARS.search(path):
             logging.debug("malicious request: %s", user)
             return False
         proj_available = Operation.query.filter_by(path=path).first()
@@ -62,32 +170,52 @@ class FileManager:
         perm = Permission(user.id, operation_id, "creator")
         db.session.add(perm)
         db.session.commit()
+        self._clear_auth_cache()
         # here we can import the permissions from Group file
         if not path.endswith(mscolab_settings.GROUP_POSTFIX):
             import_op = Operation.query.filter_by(path=f"{category}{mscolab_settings.GROUP_POSTFIX}").first()
             if import_op is not None:
                 self.import_permissions(import_op.id, operation_id, user.id)
-        data = fs.open_fs(self.data_dir)
-        data.makedir(operation.path)
-        operation_file = data.open(fs.path.combine(operation.path, 'main.ftml'), 'w')
-        if content is not None:
-            operation_file.write(content)
-        else:
-            operation_file.write(mscolab_settings.STUB_CODE)
-        operation_path = fs.path.combine(self.data_dir, operation.path)
-        r = git.Repo.init(operation_path)
-        r.git.clear_cache()
-        r.index.add(['main.ftml'])
-        r.index.commit("initial commit")
+        operation_path = self._root / operation.path
+        os.makedirs(operation_path)
+        self._write_file(operation_path, content if content is not None else mscolab_settings.STUB_CODE)
+        self._forget_repo(operation_path)
+        try:
+            # plain git commands, GitPython would start a couple of helper processes for the same
+            self._run_git(operation_path, "init", "-q")
+            self._run_git(operation_path, "add", "main.ftml")
+            # like GitPython's index.commit, neither sign the commit nor run the hooks of the host's git config
+            self._run_git(operation_path, "-c", "commit.gpgsign=false", "commit", "--no-verify",
+                          "-q", "-m", "initial commit")
+        except subprocess.CalledProcessError as error:
+            logging.error("Error while creating the git repository of %s: %s", operation.path, error.stderr)
+            Permission.query.filter_by(op_id=operation_id).delete()
+            db.session.delete(operation)
+            db.session.commit()
+            self._clear_auth_cache()
+            shutil.rmtree(operation_path, ignore_errors=True)
+            return False
         return True
 
+    def _run_git(self, operation_path, *args):
+        """
+        operation_path: directory of the operation repository
+        args: git command and its arguments
+        """
+        env = dict(os.environ)
+        # the committer GitPython would use, a configured user.email still takes precedence
+        env.setdefault("EMAIL", f"{getpass.getuser()}@{socket.gethostname()}")
+        env.setdefault("GIT_AUTHOR_NAME", getpass.getuser())
+        env.setdefault("GIT_COMMITTER_NAME", getpass.getuser())
+        subprocess.run(["git", "-C", operation_path, *args], check=True, capture_output=True, text=True, env=env)
+
     def get_operation_details(self, op_id, user):
         """
         op_id: operation id
         user: authenticated user
         """
         if self.is_member(user.id, op_id):
-            operation = Operation.query.filter_by(id=op_id).first()
+            operation = db.session.get(Operation, op_id)
             op = {
                 "id": operation.id,
                 "path": operation.path,
@@ -101,29 +229,35 @@ class FileManager:
         user: logged in user
         skip_archived: filter by active operations
         """
+        rows = db.session.query(Permission.op_id, Permission.access_level, Operation.path, Operation.description,
+                                Operation.category, Operation.active, Operation.last_used) \
+            .join(Operation, Operation.id == Permission.op_id) \
+            .filter(Permission.u_id == user.id) \
+            .all()
+        now = datetime.datetime.utcnow()
+        # outdated OPs get archived, like update_operation only by an admin or the creator
+        stale_ids = {row.op_id for row in rows
+                     if row.active and row.access_level in ("admin", "creator") and row.last_used is not None and
+                     (now - row.last_used).days > mscolab_settings.ARCHIVE_THRESHOLD}
+        if stale_ids:
+            Operation.query \
+                .filter(Operation.id.in_(stale_ids)) \
+                .update({Operation.active: False}, synchronize_session=False)
+            db.session.commit()
+
         operations = []
-        permissions = Permission.query.filter_by(u_id=user.id).all()
-        for permission in permissions:
-            operation = Operation.query.filter_by(id=permission.op_id).first()
-            if operation.last_used is not None and (
-                    datetime.datetime.utcnow() - operation.last_used).days > mscolab_settings.ARCHIVE_THRESHOLD:
-                # outdated OPs get archived
-                self.update_operation(permission.op_id, "active", False, user)
-            # new query to get uptodate data
-            if skip_archived:
-                operation = Operation.query.filter_by(id=permission.op_id, active=skip_archived).first()
-            else:
-                operation = Operation.query.filter_by(id=permission.op_id).first()
-
-            if operation is not None:
-                operations.append({
-                    "op_id": permission.op_id,
-                    "access_level": permission.access_level,
-                    "path": operation.path,
-                    "description": operation.description,
-                    "category": operation.category,
-                    "active": operation.active
-                })
+        for row in rows:
+            active = row.active and row.op_id not in stale_ids
+            if skip_archived and not active:
+                continue
+            operations.append({
+                "op_id": row.op_id,
+                "access_level": row.access_level,
+                "path": row.path,
+                "description": row.description,
+                "category": row.category,
+                "active": active
+            })
         return operations
 
     def is_member(self, u_id, op_id):
@@ -132,10 +266,7 @@ class FileManager:
         u_id: user-id
         """
         # return true only if the user is a member
-        perm = Permission.query.filter_by(u_id=u_id, op_id=op_id).first()
-        if perm is None:
-            return False
-        return True
+        return self.auth_type(u_id, op_id) is not False
 
     def is_admin(self, u_id, op_id):
         """
@@ -143,12 +274,7 @@ class FileManager:
         u_id: user-id
         """
         # return true only if the user is admin
-        perm = Permission.query.filter_by(u_id=u_id, op_id=op_id).first()
-        if perm is None:
-            return False
-        elif perm.access_level != "admin":
-            return False
-        return True
+        return self.auth_type(u_id, op_id) == "admin"
 
     def is_creator(self, u_id, op_id):
         """
@@ -156,12 +282,7 @@ class FileManager:
         u_id: user-id
         """
         # return true only if the user is creator
-        perm = Permission.query.filter_by(u_id=u_id, op_id=op_id).first()
-        if perm is None:
-            return False
-        elif perm.access_level != "creator":
-            return False
-        return True
+        return self.auth_type(u_id, op_id) == "creator"
 
     def is_collaborator(self, u_id, op_id):
         """
@@ -169,12 +290,7 @@ class FileManager:
         u_id: user-id
         """
         # return true only if the user is collaborator
-        perm = Permission.query.filter_by(u_id=u_id, op_id=op_id).first()
-        if perm is None:
-            return False
-        elif perm.access_level != "collaborator":
-            return False
-        return True
+        return self.auth_type(u_id, op_id) == "collaborator"
 
     def is_viewer(self, u_id, op_id):
         """
@@ -182,22 +298,27 @@ class FileManager:
         u_id: user-id
         """
         # return true only if the user is viewer
-        perm = Permission.query.filter_by(u_id=u_id, op_id=op_id).first()
-        if perm is None:
-            return False
-        elif perm.access_level != "viewer":
-            return False
-        return True
+        return self.auth_type(u_id, op_id) == "viewer"
 
     def auth_type(self, u_id, op_id):
         """
         op_id: operation id
         u_id: user-id
+
+        the access level is looked up once per request, see _clear_auth_cache
         """
-        perm = Permission.query.filter_by(u_id=u_id, op_id=op_id).first()
-        if perm is None:
-            return False
-        return perm.access_level
+        cache = g.setdefault("auth_type_cache", {}) if has_app_context() else {}
+        if (u_id, op_id) not in cache:
+            perm = Permission.query.filter_by(u_id=u_id, op_id=op_id).first()
+            cache[(u_id, op_id)] = False if perm is None else perm.access_level
+        return cache[(u_id, op_id)]
+
+    def _clear_auth_cache(self):
+        """
+        forgets the access levels cached by auth_type, needed after permissions were changed
+        """
+        if has_app_context():
+            g.pop("auth_type_cache", None)
 
     def modify_user(self, user, attribute=None, value=None, action=None):
         if action == "create":
@@ -208,11 +329,11 @@ class FileManager:
             else:
                 return False
         elif action == "delete":
-            user_query = User.query.filter_by(id=user.id).first()
+            user_query = db.session.get(User, user.id)
             if user_query is not None:
                 db.session.delete(user)
                 db.session.commit()
-            user_query = User.query.filter_by(id=user.id).first()
+            user_query = db.session.get(User, user.id)
             # on delete we return succesfull deleted
             if user_query is None:
                 return True
@@ -223,7 +344,7 @@ class FileManager:
                 db.session.commit()
             else:
                 return False
-        user_query = User.query.filter_by(id=user.id).first()
+        user_query = db.session.get(User, user.id)
         if user_query is None:
             return False
         if None not in (attribute, value):
@@ -241,11 +362,11 @@ class FileManager:
         attribute: attribute to be changed, eg path
         user: logged in user
         """
-        if not self.is_admin(user.id, op_id) and not self.is_creator(user.id, op_id):
+        if self.auth_type(user.id, op_id) not in ("admin", "creator"):
             return False
-        operation = Operation.query.filter_by(id=op_id).first()
+        operation = db.session.get(Operation, op_id)
         if attribute == "path":
-            if value.find("/") != -1 or value.find("\\") != -1 or (" " in value):
+            if INVALID_PATH_CHARS.search(value):
                 logging.debug("malicious request: %s", user)
                 return False
             data = fs.open_fs(self.data_dir)
@@ -253,18 +374,17 @@ class FileManager:
                 return False
             # will be move when operations are introduced
             # make a directory, else movedir
+            self.flush(op_id)
+            self._forget_repo(self._root / operation.path)
             data.makedir(value)
             data.movedir(operation.path, value)
             # when renamed to a Group operation
             if value.endswith(mscolab_settings.GROUP_POSTFIX):
                 # getting the category
                 category = value.split(mscolab_settings.GROUP_POSTFIX)[0]
-                # all operation with that category
-                ops_category = Operation.query.filter_by(category=category)
-                for ops in ops_category:
-                    # the user changing the {category}{mscolab_settings.GROUP_POSTFIX} needs to have rights in the op
-                    # then members of this op gets added to all others of same category
-                    self.import_permissions(op_id, ops.id, user.id)
+                # the user changing the {category}{mscolab_settings.GROUP_POSTFIX} needs to have rights in the op
+                # then members of this op gets added to all others of same category
+                self._import_permissions_to_category(op_id, category, user.id)
         setattr(operation, attribute, value)
         db.session.commit()
         return True
@@ -279,23 +399,25 @@ class FileManager:
         Permission.query.filter_by(op_id=op_id).delete()
         Change.query.filter_by(op_id=op_id).delete()
         Message.query.filter_by(op_id=op_id).delete()
-        operation = Operation.query.filter_by(id=op_id).first()
-        with fs.open_fs(self.data_dir) as operation_dir:
-            operation_dir.removetree(operation.path)
+        operation = db.session.get(Operation, op_id)
+        self.flush(op_id)
+        self._forget_repo(self._root / operation.path)
+        shutil.rmtree(self._root / operation.path)
         db.session.delete(operation)
         db.session.commit()
+        self._clear_auth_cache()
         return True
 
     def get_authorized_users(self, op_id):
         """
         op_id: operation-id
         """
-        permissions = Permission.query.filter_by(op_id=op_id).all()
-        users = []
-        for permission in permissions:
-            user = User.query.filter_by(id=permission.u_id).first()
-            users.append({"username": user.username, "access_level": permission.access_level})
-        return users
+        rows = db.session.query(User.username, Permission.access_level) \
+            .join(Permission, Permission.u_id == User.id) \
+            .filter(Permission.op_id == op_id) \
+            .order_by(Permission.id) \
+            .all()
+        return [{"username": username, "access_level": access_level} for username, access_level in rows]
 
     def save_file(self, op_id, content, user, comment=""):
         """
@@ -304,51 +426,147 @@ class FileManager:
         # ToDo save change in schema
         """
         # ToDo use comment
-        operation = Operation.query.filter_by(id=op_id).first()
+        operation = db.session.get(Operation, op_id)
         if not operation:
             return False
 
-        with fs.open_fs(self.data_dir) as data:
-            """
-            old file is read, the diff between old and new is calculated and stored
-            as 'Change' in changes table. comment for each change is optional
-            """
-            old_data = data.readtext(fs.path.combine(operation.path, 'main.ftml'))
-            old_data_lines = old_data.splitlines()
-            content_lines = content.splitlines()
-            diff = difflib.unified_diff(old_data_lines, content_lines, lineterm='')
-            diff_content = '\n'.join(list(diff))
-            data.writetext(fs.path.combine(operation.path, 'main.ftml'), content)
-        # commit changes if comment is not None
-        if diff_content != "":
-            # commit to git repository
-            operation_path = fs.path.combine(self.data_dir, operation.path)
-            repo = git.Repo(operation_path)
-            repo.git.clear_cache()
+        """
+        old file is read and compared with the new content, a change gets committed
+        and stored as 'Change' in changes table. comment for each change is optional
+        """
+        operation_path = self._root / operation.path
+        # most saves do not change anything, that is found out without reading the old file at once
+        if self._file_equals(operation_path / 'main.ftml', content.encode("utf-8")):
+            return False
+        old_data = self._read_file(operation_path)
+        self._write_file(operation_path, content)
+        # only changed lines make a commit, as an empty diff of the lines did before
+        if old_data.splitlines() != content.splitlines():
+            if mscolab_settings.COMMIT_DELAY > 0:
+                self._schedule_commit(op_id, user.id)
+            else:
+                self._commit_file(op_id, user.id)
+            return True
+        return False
+
+    def _commit_file(self, op_id, u_id):
+        """
+        op_id: operation-id
+        u_id: user-id of the last save
+
+        commits main.ftml to the git repository and stores it as 'Change'
+        """
+        with self._commit_lock:
+            operation = db.session.get(Operation, op_id)
+            if operation is None:
+                return
+            repo = self._repo(self._root / operation.path)
             repo.index.add(['main.ftml'])
+            # delayed saves may end where they started
+            if repo.index.entries[('main.ftml', 0)].binsha == (repo.head.commit.tree / 'main.ftml').binsha:
+                return
             cm = repo.index.commit("committing changes")
             # change db table
-            change = Change(op_id, user.id, cm.hexsha)
+            change = Change(op_id, u_id, cm.hexsha)
             db.session.add(change)
             db.session.commit()
-            return True
-        return False
+
+    def _schedule_commit(self, op_id, u_id):
+        """
+        op_id: operation-id
+        u_id: user-id of the save
+
+        commits after mscolab_settings.COMMIT_DELAY seconds, a further save of the operation restarts the wait
+        """
+        app = current_app._get_current_object()
+        with self._commit_lock:
+            pending = self._pending_commits.get(op_id)
+            if pending is not None:
+                pending[0].cancel()
+            timer = threading.Timer(mscolab_settings.COMMIT_DELAY, self._delayed_commit, args=(app, op_id))
+            timer.daemon = True
+            self._pending_commits[op_id] = (timer, app, u_id)
+            timer.start()
+
+    def _delayed_commit(self, app, op_id):
+        with app.app_context():
+            self.flush(op_id)
+
+    def flush(self, op_id=None):
+        """
+        op_id: operation-id, None for all operations
+
+        commits the saves waiting for mscolab_settings.COMMIT_DELAY at once
+        """
+        with self._commit_lock:
+            op_ids = list(self._pending_commits) if op_id is None else [op_id]
+            for pending_op_id in op_ids:
+                pending = self._pending_commits.pop(pending_op_id, None)
+                if pending is None:
+                    continue
+                timer, app, u_id = pending
+                timer.cancel()
+                if has_app_context():
+                    self._commit_file(pending_op_id, u_id)
+                else:
+                    with app.app_context():
+                        self._commit_file(pending_op_id, u_id)
 
     def get_file(self, op_id, user):
         """
         op_id: operation-id
         user: user of this request
         """
-        perm = Permission.query.filter_by(u_id=user.id, op_id=op_id).first()
-        if perm is None:
+        if not self.is_member(user.id, op_id):
             return False
-        operation = Operation.query.filter_by(id=op_id).first()
+        operation = db.session.get(Operation, op_id)
         if operation is None:
             return False
-        with fs.open_fs(self.data_dir) as data:
-            operation_file = data.open(fs.path.combine(operation.path, 'main.ftml'), 'r')
-            operation_data = operation_file.read()
-        return operation_data
+        return self._read_file(self._root / operation.path)
+
+    def _read_file(self, operation_path):
+        """
+        operation_path: directory of the operation repository
+        """
+        with open(operation_path / 'main.ftml', encoding="utf-8", newline="") as operation_file:
+            return operation_file.read()
+
+    def _file_equals(self, file_path, data):
+        """
+        file_path: file to compare
+        data: bytes to compare with
+
+        the file is compared in chunks, a different size is found without reading it
+        """
+        if os.path.getsize(file_path) != len(data):
+            return False
+        view = memoryview(data)
+        offset = 0
+        with open(file_path, "rb") as compared_file:
+            for chunk in iter(lambda: compared_file.read(1024 * 1024), b""):
+                if chunk != view[offset:offset + len(chunk)]:
+                    return False
+                offset += len(chunk)
+        return True
+
+    def _write_file(self, operation_path, content):
+        """
+        operation_path: directory of the operation repository
+        content: new content of main.ftml
+
+        the file gets replaced at once, a concurrent reader never sees a partly written file
+        """
+        tmp_path = operation_path / f".main.ftml.{os.getpid()}.{threading.get_ident()}"
+        try:
+            with open(tmp_path, "w", encoding="utf-8", newline="") as operation_file:
+                operation_file.write(content)
+                if mscolab_settings.SYNC_WRITES:
+                    operation_file.flush()
+                    os.fsync(operation_file.fileno())
+            os.replace(tmp_path, operation_path / 'main.ftml')
+        except BaseException:
+            tmp_path.unlink(missing_ok=True)
+            raise
 
     def get_all_changes(self, op_id, user, named_version=False):
         """
@@ -358,30 +576,23 @@ class FileManager:
         Get all changes, mostly to be used in the chat window, in the side panel
         to render the recent changes.
         """
-        perm = Permission.query.filter_by(u_id=user.id, op_id=op_id).first()
-        if perm is None:
+        if not self.is_member(user.id, op_id):
             return False
+        self.flush(op_id)
+        # the usernames are loaded with the changes
+        changes = Change.query.options(joinedload(Change.user)).filter(Change.op_id == op_id)
         # Get only named versions
         if named_version:
-            changes = Change.query\
-                .filter(Change.op_id == op_id)\
-                .filter(~Change.version_name.is_(None))\
-                .order_by(Change.created_at.desc())\
-                .all()
-        # Get all changes
-        else:
-            changes = Change.query\
-                .filter_by(op_id=op_id)\
-                .order_by(Change.created_at.desc())\
-                .all()
+            changes = changes.filter(~Change.version_name.is_(None))
+        changes = changes.order_by(Change.created_at.desc()).all()
 
-        return list(map(lambda change: {
+        return [{
             'id': change.id,
             'comment': change.comment,
             'version_name': change.version_name,
             'username': change.user.username,
-            'created_at': change.created_at.strftime("%Y-%m-%d, %H:%M:%S")
-        }, changes))
+            'created_at': change.created_at.strftime(CHANGE_TIME_FORMAT)
+        } for change in changes]
 
     def get_change_content(self, ch_id, user):
         """
@@ -390,23 +601,18 @@ class FileManager:
 
         Get change related to id
         """
-        ch = Change.query.filter_by(id=ch_id).first()
-        perm = Permission.query.filter_by(u_id=user.id, op_id=ch.op_id).first()
-        if perm is None:
+        change = db.session.get(Change, ch_id)
+        if change is None:
             return False
-
-        change = Change.query.filter_by(id=ch_id).first()
-        if not change:
+        if not self.is_member(user.id, change.op_id):
             return False
-        operation = Operation.query.filter_by(id=change.op_id).first()
-        operation_path = fs.path.combine(self.data_dir, operation.path)
-        repo = git.Repo(operation_path)
-        change_content = repo.git.show(f'{change.commit_hash}:main.ftml')
+        operation = db.session.get(Operation, change.op_id)
+        operation_path = self._root / operation.path
+        change_content = self._show_file(operation_path, change.commit_hash)
         return change_content
 
     def set_version_name(self, ch_id, op_id, u_id, version_name):
-        if (not self.is_admin(u_id, op_id) and not self.is_creator(u_id, op_id) and not
-                self.is_collaborator(u_id, op_id)):
+        if self.auth_type(u_id, op_id) not in ("admin", "creator", "collaborator"):
             return False
         Change.query\
             .filter(Change.id == ch_id)\
@@ -422,47 +628,45 @@ class FileManager:
         Undo a change
         # ToDo add a revert option, which removes only that commit's change
         """
-        ch = Change.query.filter_by(id=ch_id).first()
-        if (not self.is_admin(user.id, ch.op_id) and not self.is_creator(user.id, ch.op_id) and not
-                self.is_collaborator(user.id, ch.op_id)):
-            return False
+        ch = db.session.get(Change, ch_id)
         if ch is None:
             return False
-        operation = Operation.query.filter_by(id=ch.op_id).first()
-        if not ch or not operation:
+        if self.auth_type(user.id, ch.op_id) not in ("admin", "creator", "collaborator"):
             return False
-
-        operation_path = fs.path.join(self.data_dir, operation.path)
-        repo = git.Repo(operation_path)
-        repo.git.clear_cache()
-        try:
-            file_content = repo.git.show(f'{ch.commit_hash}:main.ftml')
-            with fs.open_fs(operation_path) as proj_fs:
-                proj_fs.writetext('main.ftml', file_content)
-            repo.index.add(['main.ftml'])
-            cm = repo.index.commit(f"checkout to {ch.commit_hash}")
-            change = Change(ch.op_id, user.id, cm.hexsha)
-            db.session.add(change)
-            db.session.commit()
-            return True
-        except Exception as ex:
-            logging.debug(ex)
+        operation = db.session.get(Operation, ch.op_id)
+        if operation is None:
             return False
 
+        operation_path = self._root / operation.path
+        repo = self._repo(operation_path)
+        with self._commit_lock:
+            # a pending save is committed first, the undo comes after it in the history
+            self.flush(ch.op_id)
+            try:
+                file_content = self._show_file(operation_path, ch.commit_hash)
+                self._write_file(operation_path, file_content)
+                repo.index.add(['main.ftml'])
+                cm = repo.index.commit(f"checkout to {ch.commit_hash}")
+                change = Change(ch.op_id, user.id, cm.hexsha)
+                db.session.add(change)
+                db.session.commit()
+                return True
+            except Exception as ex:
+                logging.debug(ex)
+                return False
+
     def fetch_users_without_permission(self, op_id, u_id):
-        if not self.is_admin(u_id, op_id) and not self.is_creator(u_id, op_id):
+        if self.auth_type(u_id, op_id) not in ("admin", "creator"):
             return False
 
-        user_list = User.query\
-            .join(Permission, (User.id == Permission.u_id) & (Permission.op_id == op_id), isouter=True) \
-            .add_columns(User.id, User.username) \
-            .filter(Permission.u_id.is_(None))
-
-        users = [[user.username, user.id] for user in user_list]
-        return users
+        members = db.session.query(Permission.u_id).filter(Permission.op_id == op_id)
+        rows = db.session.query(User.username, User.id) \
+            .filter(~User.id.in_(members)) \
+            .all()
+        return [[username, u_id] for username, u_id in rows]
 
     def fetch_users_with_permission(self, op_id, u_id):
-        if not self.is_admin(u_id, op_id) and not self.is_creator(u_id, op_id):
+        if self.auth_type(u_id, op_id) not in ("admin", "creator"):
             return False
 
         user_list = User.query\
@@ -475,31 +679,36 @@ class FileManager:
         return users
 
     def fetch_operation_creator(self, op_id, u_id):
-        if not self.is_admin(u_id, op_id) and not self.is_creator(u_id, op_id):
+        if self.auth_type(u_id, op_id) not in ("admin", "creator"):
             return False
         current_operation_creator = Permission.query.filter_by(op_id=op_id, access_level="creator").first()
         return current_operation_creator.user.username
 
     def add_bulk_permission(self, op_id, user, new_u_ids, access_level):
-        if not self.is_admin(user.id, op_id) and not self.is_creator(user.id, op_id):
+        if self.auth_type(user.id, op_id) not in ("admin", "creator"):
             return False
 
-        new_permissions = []
-        for u_id in new_u_ids:
-            if Permission.query.filter_by(u_id=u_id, op_id=op_id).first() is None:
-                new_permissions.append(Permission(u_id, op_id, access_level))
-        db.session.add_all(new_permissions)
-        operation = Operation.query.filter_by(id=op_id).first()
+        target_op_ids = [op_id]
+        operation = db.session.get(Operation, op_id)
         if operation.path.endswith(mscolab_settings.GROUP_POSTFIX):
             # the members of this gets added to all others of same category
             category = operation.path.split(mscolab_settings.GROUP_POSTFIX)[0]
             # all operation with that category
             ops_category = Operation.query.filter_by(category=category)
-            new_permissions = []
-            for ops in ops_category:
-                if not ops.path.endswith(mscolab_settings.GROUP_POSTFIX):
-                    new_permissions.append(Permission(u_id, ops.id, access_level))
-                db.session.add_all(new_permissions)
+            target_op_ids.extend(ops.id for ops in ops_category
+                                 if not ops.path.endswith(mscolab_settings.GROUP_POSTFIX))
+        existing_perms = db.session.query(Permission.u_id, Permission.op_id) \
+            .filter(Permission.op_id.in_(target_op_ids)) \
+            .filter(Permission.u_id.in_(new_u_ids)) \
+            .all()
+        existing = {(perm.u_id, perm.op_id) for perm in existing_perms}
+        # one INSERT for all new permissions
+        new_permissions = [{"u_id": u_id, "op_id": target_op_id, "access_level": access_level}
+                           for u_id in dict.fromkeys(new_u_ids) for target_op_id in target_op_ids
+                           if (u_id, target_op_id) not in existing]
+        if new_permissions:
+            db.session.execute(Permission.__table__.insert(), new_permissions)
+        self._clear_auth_cache()
         try:
             db.session.commit()
             return True
@@ -508,26 +717,15 @@ class FileManager:
             return False
 
     def modify_bulk_permission(self, op_id, user, u_ids, new_access_level):
-        if not self.is_admin(user.id, op_id) and not self.is_creator(user.id, op_id):
+        if self.auth_type(user.id, op_id) not in ("admin", "creator"):
             return False
 
-        # TODO: Check whether we need synchronize_session False Or Fetch
-        Permission.query\
-            .filter(Permission.op_id == op_id)\
-            .filter(Permission.u_id.in_(u_ids))\
-            .update({Permission.access_level: new_access_level}, synchronize_session='fetch')
-
-        operation = Operation.query.filter_by(id=op_id).first()
-        if operation.path.endswith(mscolab_settings.GROUP_POSTFIX):
-            # the members of this gets added to all others of same category
-            category = operation.path.split(mscolab_settings.GROUP_POSTFIX)[0]
-            # all operation with that category
-            ops_category = Operation.query.filter_by(category=category)
-            for ops in ops_category:
-                Permission.query \
-                    .filter(Permission.op_id == ops.id) \
-                    .filter(Permission.u_id.in_(u_ids)) \
-                    .update({Permission.access_level: new_access_level}, synchronize_session='fetch')
+        # the changed permissions are not used afterwards, the session needs no synchronization
+        Permission.query \
+            .filter(Permission.op_id.in_(self._group_op_ids(op_id))) \
+            .filter(Permission.u_id.in_(u_ids)) \
+            .update({Permission.access_level: new_access_level}, synchronize_session=False)
+        self._clear_auth_cache()
         try:
             db.session.commit()
             return True
@@ -536,10 +734,11 @@ class FileManager:
             return False
 
     def delete_bulk_permission(self, op_id, user, u_ids):
+        access_level = self.auth_type(user.id, op_id)
         # if the user is not a member of the operation, return false
-        if not self.is_member(user.id, op_id):
+        if access_level is False:
             return False
-        elif not self.is_admin(user.id, op_id) and not self.is_creator(user.id, op_id):
+        elif access_level not in ("admin", "creator"):
             # if the user is a member but non-admin and non-creator, and is trying to remove any other user
             if len(u_ids) != 1 or user.id not in u_ids:
                 return False
@@ -548,82 +747,55 @@ class FileManager:
             for u_id in u_ids:
                 if not self.is_member(u_id, op_id):
                     return False
-            if self.is_creator(user.id, op_id):
+            if access_level == "creator":
                 # if the user is creator and is trying to leave the operation, return false
                 if user.id in u_ids:
                     return False
 
         Permission.query \
-            .filter(Permission.op_id == op_id) \
+            .filter(Permission.op_id.in_(self._group_op_ids(op_id))) \
             .filter(Permission.u_id.in_(u_ids)) \
-            .delete(synchronize_session='fetch')
-
-        operation = Operation.query.filter_by(id=op_id).first()
-        if operation.path.endswith(mscolab_settings.GROUP_POSTFIX):
-            # the members of this gets added to all others of same category
-            category = operation.path.split(mscolab_settings.GROUP_POSTFIX)[0]
-            # all operation with that category
-            ops_category = Operation.query.filter_by(category=category)
-            for ops in ops_category:
-                Permission.query \
-                    .filter(Permission.op_id == ops.id) \
-                    .filter(Permission.u_id.in_(u_ids)) \
-                    .delete(synchronize_session='fetch')
+            .delete(synchronize_session=False)
 
         db.session.commit()
+        self._clear_auth_cache()
         return True
 
+    def _group_op_ids(self, op_id):
+        """
+        op_id: operation id
+
+        returns op_id and for a group operation also the ids of all operations of the same category
+        """
+        operation = db.session.get(Operation, op_id)
+        if not operation.path.endswith(mscolab_settings.GROUP_POSTFIX):
+            return [op_id]
+        # the members of this are also members of all others of same category
+        category = operation.path.split(mscolab_settings.GROUP_POSTFIX)[0]
+        # all operation with that category
+        ops_category = db.session.query(Operation.id).filter_by(category=category)
+        return [op_id] + [ops.id for ops in ops_category if ops.id != op_id]
+
     def import_permissions(self, import_op_id, current_op_id, u_id):
-        if not self.is_creator(u_id, current_op_id) and not self.is_admin(u_id, current_op_id):
+        if self.auth_type(u_id, current_op_id) not in ("admin", "creator"):
             return False, None, "Not the creator or admin of this operation"
 
         perm = Permission.query.filter_by(u_id=u_id, op_id=import_op_id).first()
         if perm is None:
             return False, None, "Not a member of this operation"
 
-        existing_perms = Permission.query \
-            .filter(Permission.op_id == current_op_id) \
-            .filter((Permission.u_id != u_id) & (Permission.access_level != 'creator')) \
-            .all()
-        existing_users = set([perm.u_id for perm in existing_perms])
-
-        current_operation_creator = Permission.query.filter_by(op_id=current_op_id, access_level="creator").first()
-        import_perms = Permission.query\
-            .filter(Permission.op_id == import_op_id)\
-            .filter((Permission.u_id != u_id) & (Permission.u_id != current_operation_creator.u_id))\
-            .all()
-        import_users = set([perm.u_id for perm in import_perms])
-
-        is_perm = []
-        for perm in existing_perms:
-            is_perm.append((perm.u_id, perm.access_level))
-        new_perm = []
-        for perm in import_perms:
-            access_level = perm.access_level
-            # we keep creator to the one created the operation, and substitute the imported to admin
-            if perm.access_level == "creator":
-                access_level = "admin"
-            new_perm.append((perm.u_id, access_level))
+        perms = Permission.query.filter(Permission.op_id.in_((import_op_id, current_op_id))).all()
+        import_perms = [perm for perm in perms if perm.op_id == import_op_id]
+        current_perms = [perm for perm in perms if perm.op_id == current_op_id]
+        existing_perms, is_perm, new_perm = self._permissions_to_import(import_perms, current_perms, u_id)
+        existing_users = {perm.u_id for perm in existing_perms}
+        import_users = {new_u_id for new_u_id, _ in new_perm}
 
         if sorted(new_perm) == sorted(is_perm):
             return False, None, "Permissions are already given"
 
-        # We Delete all permissions of existing users which not in new permission
-        delete_users = []
-        for perm in existing_perms:
-            if (perm.u_id, perm.access_level) not in new_perm:
-                db.session.delete(perm)
-                delete_users.append(perm.u_id)
-
-        db.session.flush()
-
-        # Then add the permissions of the imported operation based on new_perm
-        new_users = []
-        for u_id, access_level in new_perm:
-            if not (u_id, access_level) in is_perm:
-                new_users.append(u_id)
-                if Permission.query.filter_by(u_id=u_id, op_id=current_op_id).first() is None:
-                    db.session.add(Permission(u_id, current_op_id, access_level))
+        delete_ids, new_permissions = self._import_changes(existing_perms, is_perm, new_perm, current_op_id)
+        self._write_import_changes(delete_ids, new_permissions)
 
         # prepare events based on action done
         delete_users = list(existing_users.difference(import_users))
@@ -636,6 +808,7 @@ class FileManager:
             if _new_perm[m_uid] != _is_perm[m_uid]:
                 modify_users.append(m_uid)
 
+        self._clear_auth_cache()
         try:
             db.session.commit()
             return True, {"add_users": add_users, "modify_users": modify_users, "delete_users": delete_users}, "success"
@@ -643,3 +816,88 @@ class FileManager:
         except IntegrityError:
             db.session.rollback()
             return False, None, "Some error occurred! Could not import permissions. Please try again."
+
+    def _permissions_to_import(self, import_perms, current_perms, u_id):
+        """
+        import_perms: Permission rows of the operation to import from
+        current_perms: Permission rows of the operation to import into
+        u_id: user-id of the importing user
+
+        returns the existing Permission rows, and the existing and the imported permissions as
+        (u_id, access_level) lists, leaving out the importing user and the creator of the current operation
+        """
+        creator_u_ids = {perm.u_id for perm in current_perms if perm.access_level == "creator"}
+        existing_perms = [perm for perm in current_perms if perm.u_id != u_id and perm.access_level != "creator"]
+        is_perm = [(perm.u_id, perm.access_level) for perm in existing_perms]
+        # we keep creator to the one created the operation, and substitute the imported to admin
+        new_perm = [(perm.u_id, "admin" if perm.access_level == "creator" else perm.access_level)
+                    for perm in import_perms if perm.u_id != u_id and perm.u_id not in creator_u_ids]
+        return existing_perms, is_perm, new_perm
+
+    def _import_changes(self, existing_perms, is_perm, new_perm, current_op_id):
+        """
+        existing_perms, is_perm, new_perm: see _permissions_to_import
+        current_op_id: operation to import into
+
+        returns the ids of the permissions to delete and the rows of the permissions to insert
+        """
+        # We Delete all permissions of existing users which not in new permission
+        delete_ids = []
+        kept_users = set()
+        for perm in existing_perms:
+            if (perm.u_id, perm.access_level) not in new_perm:
+                delete_ids.append(perm.id)
+            else:
+                kept_users.add(perm.u_id)
+        # Then add the permissions of the imported operation based on new_perm
+        new_permissions = [{"u_id": new_u_id, "op_id": current_op_id, "access_level": access_level}
+                           for new_u_id, access_level in new_perm
+                           if (new_u_id, access_level) not in is_perm and new_u_id not in kept_users]
+        return delete_ids, new_permissions
+
+    def _write_import_changes(self, delete_ids, new_permissions):
+        """
+        delete_ids, new_permissions: see _import_changes
+
+        one DELETE and one INSERT, the caller commits
+        """
+        if delete_ids:
+            Permission.query \
+                .filter(Permission.id.in_(delete_ids)) \
+                .delete(synchronize_session=False)
+        if new_permissions:
+            db.session.execute(Permission.__table__.insert(), new_permissions)
+
+    def _import_permissions_to_category(self, import_op_id, category, u_id):
+        """
+        import_op_id: operation to import from
+        category: the permissions are imported into all other operations of this category
+        u_id: user-id of the importing user
+
+        does import_permissions for all operations of the category with a fixed number of queries
+        """
+        ops_category = db.session.query(Operation.id).filter_by(category=category)
+        op_ids = [ops.id for ops in ops_category if ops.id != import_op_id]
+        perms_by_op = defaultdict(list)
+        for perm in Permission.query.filter(Permission.op_id.in_([import_op_id] + op_ids)):
+            perms_by_op[perm.op_id].append(perm)
+        delete_ids = []
+        new_permissions = []
+        for op_id in op_ids:
+            current_perms = perms_by_op[op_id]
+            # the user needs to be the creator or an admin of the op
+            if not any(perm.u_id == u_id and perm.access_level in ("admin", "creator") for perm in current_perms):
+                continue
+            existing_perms, is_perm, new_perm = self._permissions_to_import(
+                perms_by_op[import_op_id], current_perms, u_id)
+            if sorted(new_perm) == sorted(is_perm):
+                continue
+            op_delete_ids, op_new_permissions = self._import_changes(existing_perms, is_perm, new_perm, op_id)
+            delete_ids.extend(op_delete_ids)
+            new_permissions.extend(op_new_permissions)
+        self._write_import_changes(delete_ids, new_permissions)
+        self._clear_auth_cache()
+        try:
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
@@ -0,0 +1,39 @@
+# flake8: noqa
+"""
+
+Index permissions and changes
+
+Revision ID: e62d08ce88a4
+Revises: 83993fcdf5ef
+Create Date: 2026-10-15 10:12:44.318274
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e62d08ce88a4'
+down_revision = '83993fcdf5ef'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # add_bulk_permission could store a permission twice, keep the oldest one of each user and operation
+    op.execute(
+        "DELETE FROM permissions WHERE id NOT IN "
+        "(SELECT id FROM (SELECT MIN(id) AS id FROM permissions GROUP BY u_id, op_id) AS first_permissions)")
+    with op.batch_alter_table('permissions', schema=None) as batch_op:
+        batch_op.create_index('ix_permissions_u_id_op_id', ['u_id', 'op_id'], unique=True)
+
+    with op.batch_alter_table('changes', schema=None) as batch_op:
+        batch_op.create_index('ix_changes_op_id_created_at', ['op_id', sa.text('created_at DESC')], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('changes', schema=None) as batch_op:
+        batch_op.drop_index('ix_changes_op_id_created_at')
+
+    with op.batch_alter_table('permissions', schema=None) as batch_op:
+        batch_op.drop_index('ix_permissions_u_id_op_id')
@@ -124,6 +124,10 @@ class Permission(db.Model):
         return f'<Permission u_id: {self.u_id}, op_id:{self.op_id}, access_level: {str(self.access_level)}>'
 
 
+# the access level of a user is looked up by both ids, a user has one permission per operation
+db.Index('ix_permissions_u_id_op_id', Permission.u_id, Permission.op_id, unique=True)
+
+
 class Operation(db.Model):
 
     __tablename__ = "operations"
@@ -197,3 +201,7 @@ class Change(db.Model):
         self.commit_hash = commit_hash
         self.version_name = version_name
         self.comment = comment
+
+
+# the history of an operation is listed newest first
+db.Index('ix_changes_op_id_created_at', Change.op_id, Change.created_at.desc())
@@ -24,8 +24,10 @@
     See the License for the specific language governing permissions and
     limitations under the License.
 """
+import atexit
 import json
 import logging
+import weakref
 from flask import request
 from flask_socketio import SocketIO, join_room, leave_room
 
@@ -39,6 +41,17 @@ from mslib.mscolab.conf import mscolab_settings
 socketio = SocketIO(logger=mscolab_settings.SOCKETIO_LOGGER, engineio_logger=mscolab_settings.ENGINEIO_LOGGER,
                     cors_allowed_origins=("*" if not hasattr(mscolab_settings, "CORS_ORIGINS") or
                                           "*" in mscolab_settings.CORS_ORIGINS else mscolab_settings.CORS_ORIGINS))
+# the FileManagers created by setup_managers, a weak reference does not keep a replaced one alive
+_file_managers = weakref.WeakSet()
+
+
+@atexit.register
+def _close_file_managers():
+    """
+    stops the git processes of the FileManagers on shutdown
+    """
+    for fm in list(_file_managers):
+        fm.close()
 
 
 class SocketsManager:
@@ -272,6 +285,7 @@ def setup_managers(app):
 
     cm = ChatManager()
     fm = FileManager(app.config["MSCOLAB_DATA_DIR"])
+    _file_managers.add(fm)
     sm = SocketsManager(cm, fm)
     # sockets related handlers
     socketio.on_event('connect', sm.handle_connect)
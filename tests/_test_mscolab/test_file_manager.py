@@ -180,6 +180,18 @@ class Test_FileManager(TestCase):
             assert self.fm.list_operations(self.user, skip_archived=False) == expected_result_all
             assert self.fm.list_operations(self.user, skip_archived=True) == expected_result_skipped_true
 
+    def test_list_operations_archives_outdated(self):
+        with self.app.test_client():
+            flight_path, operation = self._create_operation(flight_path="outdated")
+            self.fm.add_bulk_permission(operation.id, self.user, [self.vieweruser.id], "viewer")
+            last_used = datetime.datetime.utcnow() - datetime.timedelta(days=mscolab_settings.ARCHIVE_THRESHOLD + 1)
+            assert self.fm.update_operation(operation.id, "last_used", last_used, self.user)
+            # a viewer can not archive the operation
+            assert self.fm.list_operations(self.vieweruser)[0]["active"] is True
+            assert self.fm.list_operations(self.user, skip_archived=True) == []
+            assert self.fm.list_operations(self.user)[0]["active"] is False
+            assert Operation.query.filter_by(path=flight_path).first().active is False
+
     def test_is_creator(self):
         with self.app.test_client():
             flight_path, operation = self._create_operation(flight_path='third')
@@ -427,6 +439,20 @@ class Test_FileManager(TestCase):
             self.fm.delete_bulk_permission(operation_group.id, self.user, [self.collaboratoruser.id])
             assert self.fm.is_member(self.collaboratoruser.id, operation_group.id) is False
 
+    def test_group_permissions_of_several_users(self):
+        with self.app.test_client():
+            flight_path_no1, operation_no_1 = self._create_operation(flight_path="flightno1", category="bergen")
+            flight_path_group, operation_group = self._create_operation(flight_path="bergenGroup", category="bergen")
+            self.fm.add_bulk_permission(operation_no_1.id, self.user, [self.vieweruser.id], "viewer")
+            # all users get added to all operations of the category, existing permissions are kept
+            assert self.fm.add_bulk_permission(operation_group.id, self.user,
+                                               [self.collaboratoruser.id, self.vieweruser.id], "collaborator")
+            for operation in (operation_no_1, operation_group):
+                assert self.fm.is_collaborator(self.collaboratoruser.id, operation.id)
+            assert self.fm.is_viewer(self.vieweruser.id, operation_no_1.id)
+            assert self.fm.is_collaborator(self.vieweruser.id, operation_group.id)
+            assert len(self.fm.get_authorized_users(operation_no_1.id)) == 3
+
     def test_existing_operation_renaming_to_a_group(self):
         with self.app.test_client():
             _, operation_b1 = self._create_operation(flight_path="flightb1", category="morning")
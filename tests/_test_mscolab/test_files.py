@@ -26,6 +26,7 @@
 """
 # ToDo have to be merged into test_file_manager
 from flask_testing import TestCase
+import mock
 import os
 import pytest
 
@@ -126,13 +127,57 @@ class Test_Files(TestCase):
             flight_path, operation = self._create_operation(flight_path="operation7", content="alpha")
             assert self.fm.save_file(operation.id, "beta", self.user)
             assert self.fm.save_file(operation.id, "gamma", self.user)
-            changes = Change.query.filter_by(op_id=operation.id).all()
+            changes = Change.query.filter_by(op_id=operation.id).order_by(Change.id).all()
             assert changes is not None
             assert changes[0].id == 1
             assert self.fm.undo_changes(changes[0].id, self.user) is True
             assert len(self.fm.get_all_changes(operation.id, self.user)) == 3
             assert "beta" in self.fm.get_file(operation.id, self.user)
 
+    @mock.patch.object(mscolab_settings, "COMMIT_DELAY", 0.1)
+    def test_delayed_commit(self):
+        with self.app.test_client():
+            flight_path, operation = self._create_operation(flight_path="operation8", content="alpha")
+            for content in ("beta", "gamma", "delta"):
+                assert self.fm.save_file(operation.id, content, self.user)
+            # the timer of the last save commits the burst
+            timer = self.fm._pending_commits[operation.id][0]
+            timer.join(10)
+            assert not self.fm._pending_commits
+            assert Change.query.filter_by(op_id=operation.id).count() == 1
+            assert self.fm.get_file(operation.id, self.user) == "delta"
+
+    @mock.patch.object(mscolab_settings, "COMMIT_DELAY", 60)
+    def test_delayed_commit_flushed_by_history(self):
+        with self.app.test_client():
+            flight_path, operation = self._create_operation(flight_path="operation8", content="alpha")
+            assert self.fm.save_file(operation.id, "beta", self.user)
+            changes = self.fm.get_all_changes(operation.id, self.user)
+            assert len(changes) == 1
+            assert self.fm.save_file(operation.id, "gamma", self.user)
+            assert self.fm.undo_changes(changes[0]["id"], self.user) is True
+            assert len(self.fm.get_all_changes(operation.id, self.user)) == 3
+            assert self.fm.get_file(operation.id, self.user) == "beta"
+
+    @mock.patch.object(mscolab_settings, "COMMIT_DELAY", 60)
+    def test_delayed_commit_back_to_head(self):
+        with self.app.test_client():
+            flight_path, operation = self._create_operation(flight_path="operation8", content="alpha")
+            assert self.fm.save_file(operation.id, "beta", self.user)
+            assert self.fm.save_file(operation.id, "alpha", self.user)
+            self.fm.flush()
+            assert Change.query.filter_by(op_id=operation.id).count() == 0
+
+    @mock.patch.object(mscolab_settings, "COMMIT_DELAY", 60)
+    def test_delayed_commit_on_close(self):
+        with self.app.test_client():
+            flight_path, operation = self._create_operation(flight_path="operation8", content="alpha")
+            assert self.fm.save_file(operation.id, "beta", self.user)
+            assert Change.query.filter_by(op_id=operation.id).count() == 0
+            self.fm.close()
+            assert not self.fm._pending_commits
+            assert Change.query.filter_by(op_id=operation.id).count() == 1
+
     def test_get_operation(self):
         with self.app.test_client():
             self._create_operation(flight_path="operation9")
@@ -33,7 +33,7 @@ from urllib.parse import urljoin
 
 from mslib.msui.icons import icons
 from mslib.mscolab.conf import mscolab_settings
-from tests.utils import mscolab_check_free_port, LiveSocketTestCase
+from tests.utils import mscolab_check_free_port, LiveSocketTestCase, worker_ports
 from mslib.mscolab.server import APP, initialize_managers
 from mslib.mscolab.seed import add_user, get_user, add_operation, add_user_to_operation, get_operation
 from mslib.mscolab.mscolab import handle_db_reset
@@ -41,7 +41,7 @@ from mslib.mscolab.sockets_manager import SocketsManager
 from mslib.mscolab.models import Permission, User, Message, MessageType
 
 
-PORTS = list(range(27000, 27500))
+PORTS = worker_ports(27000)
 
 
 class Test_Socket_Manager(LiveSocketTestCase):
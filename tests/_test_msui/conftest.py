@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+"""
+
+    tests._test_msui.conftest
+    ~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    common definitions for the msui GUI tests
+
+    This file is part of MSS.
+
+    :copyright: Copyright 2023 by the MSS team, see AUTHORS.
+    :license: APACHE-2.0, see LICENSE for details.
+
+    Licensed under the Apache License, Version 2.0 (the "License");
+    you may not use this file except in compliance with the License.
+    You may obtain a copy of the License at
+
+       http://www.apache.org/licenses/LICENSE-2.0
+
+    Unless required by applicable law or agreed to in writing, software
+    distributed under the License is distributed on an "AS IS" BASIS,
+    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+    See the License for the specific language governing permissions and
+    limitations under the License.
+"""
+import sys
+import pytest
+from PyQt5 import QtWidgets
+
+# kept alive until interpreter exit, destroying it while widgets are left over crashes Qt
+_application = None
+
+
+@pytest.fixture(scope="session", autouse=True)
+def qapplication(qt_display):
+    """One QApplication shared by all msui tests, constructing it per test is expensive"""
+    global _application
+    _application = QtWidgets.QApplication.instance() or QtWidgets.QApplication(sys.argv)
+    yield _application
+
+
+@pytest.fixture(autouse=True)
+def gui_testsetup(qt_display, fail_if_open_message_boxes_left, keyring_reset):
+    """All msui tests need the virtual display, an empty keyring and must not leave message boxes open"""
+    yield
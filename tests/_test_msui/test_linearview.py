@@ -37,9 +37,9 @@ from PyQt5 import QtWidgets, QtTest, QtCore
 from mslib.msui import flighttrack as ft
 import mslib.msui.linearview as tv
 from mslib.msui.mpl_qtwidget import _DEFAULT_SETTINGS_LINEARVIEW
-from tests.utils import wait_until_signal
+from tests.utils import wait_until_signal, worker_ports
 
-PORTS = list(range(26000, 26500))
+PORTS = worker_ports(26000)
 
 
 class Test_MSS_LV_Options_Dialog(object):
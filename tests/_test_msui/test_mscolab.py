@@ -39,14 +39,17 @@ from mslib.mscolab.models import Permission, User
 from mslib.msui.flighttrack import WaypointsTableModel
 from PyQt5 import QtCore, QtTest, QtWidgets
 from mslib.utils.config import read_config_file, config_loader, modify_config_file
-from tests.utils import mscolab_start_server, create_msui_settings_file, ExceptionMock
+from tests.utils import mscolab_start_server, create_msui_settings_file, ExceptionMock, worker_ports
 from mslib.msui import msui
 from mslib.msui import mscolab
 from mslib.mscolab.mscolab import handle_db_reset
 from tests.constants import MSUI_CONFIG_PATH
 from mslib.mscolab.seed import add_user, get_user, add_operation, add_user_to_operation
 
-PORTS = list(range(25000, 25500))
+pytestmark = [pytest.mark.gui, pytest.mark.mscolab]
+
+
+PORTS = worker_ports(25000)
 
 
 class Test_Mscolab_connect_window():
@@ -31,7 +31,7 @@ import sys
 
 from mslib.mscolab.conf import mscolab_settings
 from PyQt5 import QtCore, QtTest, QtWidgets
-from tests.utils import mscolab_start_server
+from tests.utils import mscolab_start_server, worker_ports
 from mslib.msui import mscolab
 from mslib.msui import msui
 from mslib.mscolab.mscolab import handle_db_reset
@@ -39,7 +39,10 @@ from mslib.mscolab.seed import add_user, get_user, add_operation, add_user_to_op
 from mslib.utils.config import modify_config_file
 
 
-PORTS = list(range(24000, 24500))
+pytestmark = [pytest.mark.gui, pytest.mark.mscolab]
+
+
+PORTS = worker_ports(24000)
 
 
 @pytest.mark.skipif(os.name == "nt",
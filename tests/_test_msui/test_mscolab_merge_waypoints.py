@@ -35,13 +35,16 @@ from mslib.msui import flighttrack as ft
 from mslib.mscolab.conf import mscolab_settings
 from PyQt5 import QtCore, QtTest, QtWidgets
 from tests.utils import (mscolab_start_server, mscolab_register_and_login, mscolab_create_operation,
-                         mscolab_delete_all_operations, mscolab_delete_user)
+                         mscolab_delete_all_operations, mscolab_delete_user, worker_ports)
 from mslib.msui import mscolab
 from mslib.msui import msui
 from mslib.mscolab.mscolab import handle_db_reset
 
 
-PORTS = list(range(23000, 23500))
+pytestmark = [pytest.mark.gui, pytest.mark.mscolab]
+
+
+PORTS = worker_ports(23000)
 
 
 @pytest.mark.skipif(os.name == "nt",
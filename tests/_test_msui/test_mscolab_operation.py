@@ -31,14 +31,17 @@ import pytest
 from mslib.mscolab.conf import mscolab_settings
 from mslib.mscolab.models import Message
 from PyQt5 import QtCore, QtTest, QtWidgets
-from tests.utils import mscolab_start_server
+from tests.utils import mscolab_start_server, worker_ports
 from mslib.msui import mscolab
 from mslib.msui import msui
 from mslib.mscolab.mscolab import handle_db_reset
 from mslib.mscolab.seed import add_user, get_user, add_operation, add_user_to_operation
 from mslib.utils.config import modify_config_file
 
-PORTS = list(range(22000, 22500))
+pytestmark = [pytest.mark.gui, pytest.mark.mscolab]
+
+
+PORTS = worker_ports(22000)
 
 
 class Actions(object):
@@ -28,11 +28,12 @@ import os
 import mock
 import pytest
 from tests._test_msui.test_mscolab_merge_waypoints import Test_Mscolab_Merge_Waypoints
+from tests.utils import worker_ports
 from mslib.msui import flighttrack as ft
 from PyQt5 import QtCore, QtTest, QtWidgets
 
 
-PORTS = list(range(21000, 21500))
+PORTS = worker_ports(21000)
 
 
 # ToDo Understand why this needs to be skipped, it runs when direct called
@@ -25,93 +25,125 @@
     limitations under the License.
 """
 import os
-import sys
 import pytest
 import mock
 
-from tests.utils import mscolab_start_server
+from tests.utils import mscolab_start_server, worker_ports
 from mslib.mscolab.conf import mscolab_settings
 from PyQt5 import QtCore, QtTest, QtWidgets
+from mslib.msui import flighttrack as ft
 from mslib.msui import mscolab
 from mslib.msui import msui
+from mslib.mscolab.models import db, Change, Message, User
 from mslib.mscolab.mscolab import handle_db_reset
 from mslib.mscolab.seed import add_user, get_user, add_operation, add_user_to_operation
 from mslib.utils.config import modify_config_file
 
+pytestmark = [pytest.mark.gui, pytest.mark.mscolab]
 
-PORTS = list(range(20000, 20500))
+
+PORTS = worker_ports(20000)
+
+
+def _wait_until(predicate, timeout=2000):
+    """
+    Processes events until predicate() holds or timeout (ms) expires, PyQt5 has no QTest.qWaitFor
+    """
+    timer = QtCore.QElapsedTimer()
+    timer.start()
+    while not predicate() and not timer.hasExpired(timeout):
+        QtTest.QTest.qWait(10)
+    return predicate()
+
+
+def _fast_db_reset(app, models):
+    """
+    Empties the mscolab tables of models in one transaction, the schema stays.
+    """
+    with app.app_context():
+        for model in models:
+            db.session.query(model).delete(synchronize_session=False)
+        db.session.commit()
+
+
+@pytest.fixture(scope="class")
+def mscolab_server():
+    """One mscolab server for all tests of a class, the schema is created once and emptied by the tests"""
+    handle_db_reset()
+    process, url, app, _, cm, fm = mscolab_start_server(PORTS)
+    yield process, url, app, cm, fm
+    process.terminate()
 
 
 @pytest.mark.skipif(os.name == "nt",
                     reason="multiprocessing needs currently start_method fork")
 class Test_MscolabVersionHistory(object):
-    def setup_method(self):
-        handle_db_reset()
-        self.process, self.url, self.app, _, self.cm, self.fm = mscolab_start_server(PORTS)
-        self.userdata = 'UV10@uv10', 'UV10', 'uv10'
-        self.operation_name = "europe"
-        assert add_user(self.userdata[0], self.userdata[1], self.userdata[2])
-        assert add_operation(self.operation_name, "test europe")
-        assert add_user_to_operation(path=self.operation_name, emailid=self.userdata[0])
-        self.user = get_user(self.userdata[0])
-        QtTest.QTest.qWait(500)
-        self.application = QtWidgets.QApplication(sys.argv)
-        self.window = msui.MSUIMainWindow(mscolab_data_dir=mscolab_settings.MSCOLAB_DATA_DIR)
-        self.window.create_new_flight_track()
-        self.window.show()
+    @pytest.fixture(scope="class")
+    @classmethod
+    def logged_in_window(cls, mscolab_server):
+        """The tests of the class share one window, logged in to the operation once"""
+        cls.process, cls.url, cls.app, cls.cm, cls.fm = mscolab_server
+        cls.userdata = 'UV10@uv10', 'UV10', 'uv10'
+        cls.operation_name = "europe"
+        assert add_user(cls.userdata[0], cls.userdata[1], cls.userdata[2])
+        assert add_operation(cls.operation_name, "test europe")
+        assert add_user_to_operation(path=cls.operation_name, emailid=cls.userdata[0])
+        cls.user = get_user(cls.userdata[0])
+        cls.window = msui.MSUIMainWindow(mscolab_data_dir=mscolab_settings.MSCOLAB_DATA_DIR)
+        cls.window.create_new_flight_track()
+        cls.window.show()
+        QtTest.QTest.qWaitForWindowExposed(cls.window, 2000)
         # connect and login to mscolab
-        self._connect_to_mscolab()
-        modify_config_file({"MSS_auth": {self.url: self.userdata[0]}})
-        self._login(self.userdata[0], self.userdata[2])
-        # activate operation and open chat window
-        self._activate_operation_at_index(0)
+        cls._connect_to_mscolab()
+        modify_config_file({"MSS_auth": {cls.url: cls.userdata[0]}})
+        cls._login(cls.userdata[0], cls.userdata[2])
+        cls._activate_operation_at_index(0)
+        yield
+        cls.window.mscolab.logout()
+        if cls.window.mscolab.conn:
+            cls.window.mscolab.conn.disconnect()
+        cls.window.hide()
+        cls.window.deleteLater()
+        QtWidgets.QApplication.processEvents()
+
+    @pytest.fixture(autouse=True)
+    def setup(self, logged_in_window):
+        # only the changes go, user, operation and login stay for the next test
+        _fast_db_reset(self.app, models=(Change, Message))
+        # the message box check destroys the native windows after each test, show() creates it again
+        self.window.show()
+        QtTest.QTest.qWaitForWindowExposed(self.window, 2000)
+        # open version history window
         self.window.actionVersionHistory.trigger()
-        QtWidgets.QApplication.processEvents()
         self.version_window = self.window.mscolab.version_window
         assert self.version_window is not None
-        QtTest.QTest.qWaitForWindowExposed(self.window)
         QtWidgets.QApplication.processEvents()
-
-    def teardown_method(self):
-        self.window.mscolab.logout()
+        yield
         if self.window.mscolab.version_window:
             self.window.mscolab.version_window.close()
-        if self.window.mscolab.conn:
-            self.window.mscolab.conn.disconnect()
-        self.application.quit()
         QtWidgets.QApplication.processEvents()
-        self.process.terminate()
 
     def test_changes(self):
         self._change_version_filter(1)
         len_prev = self.version_window.changes.count()
         # make a changes
-        self.window.mscolab.waypoints_model.invert_direction()
-        QtWidgets.QApplication.processEvents()
-        QtTest.QTest.qWait(100)
-        self.window.mscolab.waypoints_model.invert_direction()
-        QtWidgets.QApplication.processEvents()
-        QtTest.QTest.qWait(100)
+        self._invert_direction(times=2)
         self.version_window.load_all_changes()
-        QtWidgets.QApplication.processEvents()
         len_after = self.version_window.changes.count()
         assert len_prev == (len_after - 2)
 
     @mock.patch("PyQt5.QtWidgets.QInputDialog.getText", return_value=["MyVersionName", True])
     def test_set_version_name(self, mockbox):
         self._set_version_name()
-        QtTest.QTest.qWait(100)
         assert self.version_window.changes.currentItem().version_name == "MyVersionName"
         assert self.version_window.changes.count() == 1
 
     @mock.patch("PyQt5.QtWidgets.QInputDialog.getText", return_value=["MyVersionName", True])
     def test_version_name_delete(self, mockbox):
         self._set_version_name()
-        QtTest.QTest.qWait(100)
         assert self.version_window.changes.currentItem().version_name == "MyVersionName"
-        QtTest.QTest.mouseClick(self.version_window.deleteVersionNameBtn, QtCore.Qt.LeftButton)
+        self.version_window.deleteVersionNameBtn.click()
         QtWidgets.QApplication.processEvents()
-        QtTest.QTest.qWait(500)
         assert self.version_window.changes.count() == 1
         assert self.version_window.changes.currentItem().version_name is None
 
@@ -119,61 +151,53 @@ class Test_MscolabVersionHistory(object):
     def test_undo_changes(self, mockbox):
         self._change_version_filter(1)
         # make changes
-        for i in range(2):
-            self.window.mscolab.waypoints_model.invert_direction()
-            QtWidgets.QApplication.processEvents()
-            QtTest.QTest.qWait(100)
+        self._store_changes(2)
         self.version_window.load_all_changes()
-        QtWidgets.QApplication.processEvents()
         changes_count = self.version_window.changes.count()
         self._activate_change_at_index(1)
-        QtTest.QTest.mouseClick(self.version_window.checkoutBtn, QtCore.Qt.LeftButton)
+        self.version_window.checkoutBtn.click()
         QtWidgets.QApplication.processEvents()
-        QtTest.QTest.qWait(200)
         new_changes_count = self.version_window.changes.count()
         assert changes_count + 1 == new_changes_count
 
     def test_refresh(self):
         self._change_version_filter(1)
         changes_count = self.version_window.changes.count()
-        self.window.mscolab.waypoints_model.invert_direction()
-        QtWidgets.QApplication.processEvents()
-        QtTest.QTest.qWait(100)
-        self.window.mscolab.waypoints_model.invert_direction()
+        self._store_changes(2)
+        self.version_window.refreshBtn.click()
         QtWidgets.QApplication.processEvents()
-        QtTest.QTest.qWait(100)
-        QtTest.QTest.mouseClick(self.version_window.refreshBtn, QtCore.Qt.LeftButton)
-        QtWidgets.QApplication.processEvents()
-        QtTest.QTest.qWait(100)
         new_changes_count = self.version_window.changes.count()
         assert new_changes_count == changes_count + 2
 
-    def _connect_to_mscolab(self):
-        self.connect_window = mscolab.MSColab_ConnectDialog(parent=self.window, mscolab=self.window.mscolab)
-        self.window.mscolab.connect_window = self.connect_window
-        assert self.connect_window is not None
-        self.connect_window.urlCb.setEditText(self.url)
-        self.connect_window.show()
-        QtTest.QTest.mouseClick(self.connect_window.connectBtn, QtCore.Qt.LeftButton)
-        QtWidgets.QApplication.processEvents()
-        QtTest.QTest.qWait(500)
-
-    def _login(self, emailid, password):
-        assert self.connect_window is not None
-        self.connect_window.loginEmailLe.setText(emailid)
-        self.connect_window.loginPasswordLe.setText(password)
-        QtTest.QTest.mouseClick(self.connect_window.loginBtn, QtCore.Qt.LeftButton)
-        QtWidgets.QApplication.processEvents()
-        QtTest.QTest.qWait(500)
-
-    def _activate_operation_at_index(self, index):
-        assert index < self.window.listOperationsMSC.count()
-        item = self.window.listOperationsMSC.item(index)
-        point = self.window.listOperationsMSC.visualItemRect(item).center()
-        QtTest.QTest.mouseClick(self.window.listOperationsMSC.viewport(), QtCore.Qt.LeftButton, pos=point)
-        QtWidgets.QApplication.processEvents()
-        QtTest.QTest.mouseDClick(self.window.listOperationsMSC.viewport(), QtCore.Qt.LeftButton, pos=point)
-        QtWidgets.QApplication.processEvents()
+    @classmethod
+    def _connect_to_mscolab(cls):
+        cls.connect_window = mscolab.MSColab_ConnectDialog(parent=cls.window, mscolab=cls.window.mscolab)
+        cls.window.mscolab.connect_window = cls.connect_window
+        assert cls.connect_window is not None
+        cls.connect_window.urlCb.setEditText(cls.url)
+        cls.connect_window.show()
+        QtTest.QTest.qWaitForWindowExposed(cls.connect_window, 2000)
+        cls.connect_window.connectBtn.click()
+        assert _wait_until(lambda: cls.connect_window.stackedWidget.currentWidget() == cls.connect_window.loginPage)
+
+    @classmethod
+    def _login(cls, emailid, password):
+        assert cls.connect_window is not None
+        cls.connect_window.loginEmailLe.setText(emailid)
+        cls.connect_window.loginPasswordLe.setText(password)
+        cls.connect_window.loginBtn.click()
+        assert _wait_until(lambda: cls.window.listOperationsMSC.count() > 0)
+
+    @classmethod
+    def _activate_operation_at_index(cls, index):
+        assert index < cls.window.listOperationsMSC.count()
+        item = cls.window.listOperationsMSC.item(index)
+        point = cls.window.listOperationsMSC.visualItemRect(item).center()
+        QtTest.QTest.mouseClick(cls.window.listOperationsMSC.viewport(), QtCore.Qt.LeftButton, pos=point)
+        QtTest.QTest.mouseDClick(cls.window.listOperationsMSC.viewport(), QtCore.Qt.LeftButton, pos=point)
+        # the operation is active once its waypoints are loaded from the server
+        assert _wait_until(lambda: cls.window.mscolab.active_op_id == item.op_id and
+                           cls.window.mscolab.waypoints_model is not None)
 
     def _activate_change_at_index(self, index):
         assert self.version_window is not None
@@ -181,10 +205,8 @@ class Test_MscolabVersionHistory(object):
         item = self.version_window.changes.item(index)
         point = self.version_window.changes.visualItemRect(item).center()
         QtTest.QTest.mouseClick(self.version_window.changes.viewport(), QtCore.Qt.LeftButton, pos=point)
-        QtWidgets.QApplication.processEvents()
         QtTest.QTest.keyClick(self.version_window.changes.viewport(), QtCore.Qt.Key_Return)
         QtWidgets.QApplication.processEvents()
-        QtTest.QTest.qWait(100)
 
     def _change_version_filter(self, index):
         assert self.version_window is not None
@@ -192,17 +214,29 @@ class Test_MscolabVersionHistory(object):
         self.version_window.versionFilterCB.setCurrentIndex(index)
         self.version_window.versionFilterCB.currentIndexChanged.emit(index)
         QtWidgets.QApplication.processEvents()
-        QtTest.QTest.qWait(100)
+
+    def _invert_direction(self, times=1):
+        # each change is saved through the socket, the server answers with file-changed once it is stored
+        spy = QtTest.QSignalSpy(self.window.mscolab.conn.signal_reload)
+        for _ in range(times):
+            self.window.mscolab.waypoints_model.invert_direction()
+        assert _wait_until(lambda: len(spy) >= times)
+
+    def _store_changes(self, count):
+        # stored by the file manager directly, for tests which only need changes to exist
+        op_id = self.window.mscolab.active_op_id
+        with self.app.app_context():
+            user = User.query.filter_by(emailid=self.userdata[0]).first()
+            for _ in range(count):
+                waypoints_model = ft.WaypointsTableModel(xml_content=self.fm.get_file(op_id, user))
+                waypoints_model.invert_direction()
+                assert self.fm.save_file(op_id, waypoints_model.get_xml_content(), user)
 
     def _set_version_name(self):
         self._change_version_filter(1)
         # make a changes
-        self.window.mscolab.waypoints_model.invert_direction()
-        QtWidgets.QApplication.processEvents()
-        QtTest.QTest.qWait(100)
+        self._store_changes(1)
         self.version_window.load_all_changes()
-        QtWidgets.QApplication.processEvents()
         self._activate_change_at_index(0)
-        QtWidgets.QApplication.processEvents()
-        QtTest.QTest.mouseClick(self.version_window.nameVersionBtn, QtCore.Qt.LeftButton)
+        self.version_window.nameVersionBtn.click()
         QtWidgets.QApplication.processEvents()
@@ -26,7 +26,6 @@
 """
 
 
-import sys
 import mock
 import os
 import fs
@@ -39,8 +38,11 @@ from mslib import __version__
 from tests.constants import ROOT_DIR, POSIX, MSUI_CONFIG_PATH
 from mslib.msui import msui
 from mslib.msui import msui_mainwindow as msui_mw
+from mslib.msui import flighttrack as ft
 from tests.utils import ExceptionMock
-from mslib.utils.config import read_config_file
+from mslib.utils.config import config_loader, read_config_file
+
+pytestmark = pytest.mark.gui
 
 
 @mock.patch("mslib.msui.msui.constants.POSIX", POSIX)
@@ -68,8 +70,7 @@ def test_main():
 
 class Test_MSS_TutorialMode():
     def setup_method(self):
-        self.application = QtWidgets.QApplication(sys.argv)
-        self.application.setApplicationDisplayName("MSUI")
+        QtWidgets.QApplication.instance().setApplicationDisplayName("MSUI")
         self.main_window = msui_mw.MSUIMainWindow(tutorial_mode=True)
         self.main_window.create_new_flight_track()
         self.main_window.show()
@@ -79,55 +80,55 @@ class Test_MSS_TutorialMode():
         self.tutorial_dir = fs.path.combine(MSUI_CONFIG_PATH, 'tutorial_images')
 
     def teardown_method(self):
+        self.main_window.shortcuts_dlg.close()
         self.main_window.hide()
-        QtWidgets.QApplication.processEvents()
-        self.application.quit()
+        self.main_window.deleteLater()
         QtWidgets.QApplication.processEvents()
 
     def test_tutorial_dir(self):
         dir_name, name = fs.path.split(self.tutorial_dir)
         with fs.open_fs(dir_name) as _fs:
             assert _fs.exists(name)
-        # seems we don't have a window manager in the test environment on github
-        # checking only for a few
-        with (fs.open_fs(self.tutorial_dir) as _fs):
-            common_images = _fs.listdir('/')
-            assert 'menufile-file.png' in common_images
-            assert 'msuimainwindow-operation-archive.png' in common_images
-            assert 'msuimainwindow-work-asynchronously.png' in common_images
-            assert 'msuimainwindow-connect.png' in common_images
+            # seems we don't have a window manager in the test environment on github
+            # checking only for a few
+            common_images = set(_fs.listdir(name))
+        assert {'menufile-file.png',
+                'msuimainwindow-operation-archive.png',
+                'msuimainwindow-work-asynchronously.png',
+                'msuimainwindow-connect.png'}.issubset(common_images)
 
 
 class Test_MSS_AboutDialog():
     def setup_method(self):
-        self.application = QtWidgets.QApplication(sys.argv)
         self.window = msui_mw.MSUI_AboutDialog()
 
     def test_milestone_url(self):
+        assert f"milestone%3A{__version__[:-1]}" in self.window.milestone_url
+
+    @pytest.mark.network
+    def test_milestone_url_online(self):
         with urlopen(self.window.milestone_url) as f:
             text = f.read()
         pattern = f'value="is:closed milestone:{__version__[:-1]}"'
         assert pattern in text.decode('utf-8')
 
     def teardown_method(self):
-        self.window.hide()
-        QtWidgets.QApplication.processEvents()
-        self.application.quit()
+        self.window.close()
+        self.window.deleteLater()
         QtWidgets.QApplication.processEvents()
 
 
 class Test_MSS_ShortcutDialog():
     def setup_method(self):
-        self.application = QtWidgets.QApplication(sys.argv)
         self.main_window = msui_mw.MSUIMainWindow()
         self.main_window.show()
         self.shortcuts = msui_mw.MSUI_ShortcutsDialog()
 
     def teardown_method(self):
-        self.shortcuts.hide()
+        self.shortcuts.close()
+        self.shortcuts.deleteLater()
         self.main_window.hide()
-        QtWidgets.QApplication.processEvents()
-        self.application.quit()
+        self.main_window.deleteLater()
         QtWidgets.QApplication.processEvents()
 
     def test_shortcuts_present(self):
@@ -160,11 +161,12 @@ class Test_MSS_ShortcutDialog():
 
 class Test_MSSSideViewWindow(object):
     # temporary file paths to test open feature
-    sample_path = os.path.join(os.path.dirname(__file__), "..", "data")
+    sample_path = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "data"))
     open_csv = os.path.join(sample_path, "example.csv")
     open_ftml = os.path.join(sample_path, "example.ftml")
     open_txt = os.path.join(sample_path, "example.txt")
     open_fls = os.path.join(sample_path, "flitestar.txt")
+    empty_settings = os.path.join(sample_path, "empty_msui_settings.json")
     # temporary file paths to test save feature
     save_csv = os.path.join(ROOT_DIR, "example.csv")
     save_ftml = os.path.join(ROOT_DIR, "example.ftml")
@@ -181,100 +183,109 @@ class Test_MSSSideViewWindow(object):
         # "GPX": ["gpx", "mslib.plugins.io.gpx", "save_to_gpx"]
     }
 
-    def setup_method(self):
-        self.sample_path = os.path.join(
-            os.path.dirname(os.path.abspath(__file__)),
-            '../',
-            'data/')
-        self.application = QtWidgets.QApplication(sys.argv)
-
-        self.window = msui.MSUIMainWindow()
-        self.window.create_new_flight_track()
-        self.window.show()
-        QtWidgets.QApplication.processEvents()
-        QtTest.QTest.qWaitForWindowExposed(self.window)
+    @pytest.fixture(scope="class")
+    @classmethod
+    def main_window(cls):
+        """The main window is created once for all tests of the class"""
+        window = msui.MSUIMainWindow()
+        window.create_new_flight_track()
+        window.show()
+        QtTest.QTest.qWaitForWindowExposed(window, 2000)
+        yield window
+        window.hide()
+        window.deleteLater()
         QtWidgets.QApplication.processEvents()
 
-    def teardown_method(self):
-        config_file = os.path.join(
-            self.sample_path,
-            'empty_msui_settings.json',
-        )
-        read_config_file(path=config_file)
-        for i in range(self.window.listViews.count()):
-            self.window.listViews.item(i).window.hide()
-        self.window.hide()
-        QtWidgets.QApplication.processEvents()
-        self.application.quit()
+    @pytest.fixture(autouse=True)
+    def reset_main_window(self, main_window):
+        """Brings the shared main window back to one default flight track, no views and no plugins"""
+        self.window = main_window
+        # the message box check destroys the native windows after each test, show() creates it again
+        self.window.show()
+        QtTest.QTest.qWaitForWindowExposed(self.window, 2000)
+        yield
+        read_config_file(path=self.empty_settings)
+        while self.window.listViews.count() > 0:
+            self.window.listViews.item(0).window.handle_force_close()
+        if self.window.shortcuts_dlg is not None:
+            self.window.shortcuts_dlg.hide()
+        while self.window.listFlightTracks.count() > 1:
+            self.window.listFlightTracks.takeItem(1)
+        self.window.activate_flight_track(self.window.listFlightTracks.item(0))
+        default_flightlevel = config_loader(dataset="new_flighttrack_flightlevel")
+        self.window.active_flight_track.replace_waypoints(
+            [ft.Waypoint(flightlevel=default_flightlevel, location=wp)
+             for wp in config_loader(dataset="new_flighttrack_template")])
+        self.window.remove_plugins()
         QtWidgets.QApplication.processEvents()
 
     def test_no_updater(self):
         assert not hasattr(self.window, "updater")
 
-    @mock.patch("PyQt5.QtWidgets.QMessageBox")
-    def test_app_start(self, mockbox):
-        assert mockbox.critical.call_count == 0
+    @mock.patch("PyQt5.QtWidgets.QMessageBox.critical")
+    def test_app_start(self, mockcritical):
+        assert mockcritical.call_count == 0
 
-    @mock.patch("PyQt5.QtWidgets.QMessageBox")
-    def test_new_flightrack(self, mockbox):
+    @mock.patch("PyQt5.QtWidgets.QMessageBox.critical")
+    def test_new_flightrack(self, mockcritical):
         assert self.window.listFlightTracks.count() == 1
         self.window.actionNewFlightTrack.trigger()
         QtWidgets.QApplication.processEvents()
         assert self.window.listFlightTracks.count() == 2
-        assert mockbox.critical.call_count == 0
+        assert mockcritical.call_count == 0
 
-    @mock.patch("PyQt5.QtWidgets.QMessageBox")
-    def test_open_topview(self, mockbox):
+    @mock.patch("PyQt5.QtWidgets.QMessageBox.critical")
+    def test_open_topview(self, mockcritical):
         assert self.window.listViews.count() == 0
         self.window.actionTopView.trigger()
         QtWidgets.QApplication.processEvents()
-        assert mockbox.critical.call_count == 0
+        assert mockcritical.call_count == 0
         assert self.window.listViews.count() == 1
 
-    @mock.patch("PyQt5.QtWidgets.QMessageBox")
-    def test_open_sideview(self, mockbox):
+    @mock.patch("PyQt5.QtWidgets.QMessageBox.critical")
+    def test_open_sideview(self, mockcritical):
         assert self.window.listViews.count() == 0
         self.window.actionSideView.trigger()
         QtWidgets.QApplication.processEvents()
-        assert mockbox.critical.call_count == 0
+        assert mockcritical.call_count == 0
         assert self.window.listViews.count() == 1
 
-    @mock.patch("PyQt5.QtWidgets.QMessageBox")
-    def test_open_tableview(self, mockbox):
+    @mock.patch("PyQt5.QtWidgets.QMessageBox.critical")
+    def test_open_tableview(self, mockcritical):
         assert self.window.listViews.count() == 0
         self.window.actionTableView.trigger()
         QtWidgets.QApplication.processEvents()
-        assert mockbox.critical.call_count == 0
+        assert mockcritical.call_count == 0
         assert self.window.listViews.count() == 1
 
-    @mock.patch("PyQt5.QtWidgets.QMessageBox")
-    def test_open_linearview(self, mockbox):
+    @mock.patch("PyQt5.QtWidgets.QMessageBox.critical")
+    def test_open_linearview(self, mockcritical):
         assert self.window.listViews.count() == 0
         self.window.actionLinearView.trigger()
         self.window.listViews.itemActivated.emit(self.window.listViews.item(0))
         QtWidgets.QApplication.processEvents()
         assert self.window.listViews.count() == 1
-        assert mockbox.critical.call_count == 0
+        assert mockcritical.call_count == 0
 
-    @mock.patch("PyQt5.QtWidgets.QMessageBox")
-    def test_open_about(self, mockbox):
+    @mock.patch("PyQt5.QtWidgets.QMessageBox.critical")
+    def test_open_about(self, mockcritical):
         self.window.actionAboutMSUI.trigger()
         QtWidgets.QApplication.processEvents()
-        assert mockbox.critical.call_count == 0
+        assert mockcritical.call_count == 0
 
-    @mock.patch("PyQt5.QtWidgets.QMessageBox")
-    def test_open_config(self, mockbox):
+    @mock.patch("PyQt5.QtWidgets.QMessageBox.critical")
+    def test_open_config(self, mockcritical):
         pytest.skip("To be done")
         self.window.actionConfigurationEditor.trigger()
         QtWidgets.QApplication.processEvents()
         self.window.config_editor.close()
-        assert mockbox.critical.call_count == 0
+        assert mockcritical.call_count == 0
 
-    @mock.patch("PyQt5.QtWidgets.QMessageBox")
-    def test_open_shortcut(self, mockbox):
+    @mock.patch("PyQt5.QtWidgets.QMessageBox.critical")
+    def test_open_shortcut(self, mockcritical):
         self.window.actionShortcuts.trigger()
         QtWidgets.QApplication.processEvents()
-        assert mockbox.critical.call_count == 0
+        assert mockcritical.call_count == 0
 
     @pytest.mark.parametrize("save_file", [[save_ftml]])
     def test_plugin_saveas(self, save_file):
@@ -293,7 +304,8 @@ class Test_MSSSideViewWindow(object):
     @pytest.mark.parametrize("name", [("example.ftml", "actionImportFlightTrackFTML", 5),
                                       ("example.csv", "actionImportFlightTrackCSV", 5),
                                       ("example.txt", "actionImportFlightTrackTXT", 5),
-                                      ("flitestar.txt", "actionImportFlightTrackFliteStar", 10)])
+                                      ("flitestar.txt", "actionImportFlightTrackFliteStar", 10)],
+                             ids=["FTML", "CSV", "TXT", "FliteStar"])
     def test_plugin_import(self, name):
         with mock.patch("mslib.msui.msui_mainwindow.config_loader", return_value=self.import_plugins):
             self.window.add_import_plugins("qt")
@@ -310,7 +322,8 @@ class Test_MSSSideViewWindow(object):
             assert len(self.window.active_flight_track.waypoints) == name[2]
 
     @pytest.mark.parametrize("save_file", [[save_ftml, "actionExportFlightTrackFTML"],
-                                           [save_txt, "actionExportFlightTrackText"]])
+                                           [save_txt, "actionExportFlightTrackText"]],
+                             ids=["FTML", "Text"])
     def test_plugin_export(self, save_file):
         with mock.patch("mslib.msui.msui_mainwindow.config_loader", return_value=self.export_plugins):
             self.window.add_export_plugins("qt")
@@ -329,9 +342,9 @@ class Test_MSSSideViewWindow(object):
             os.remove(save_file[0])
 
     @pytest.mark.skip("needs to be refactored to become independent")
-    @mock.patch("PyQt5.QtWidgets.QMessageBox")
+    @mock.patch("PyQt5.QtWidgets.QMessageBox.critical")
     @mock.patch("mslib.msui.msui_mainwindow.config_loader", return_value=export_plugins)
-    def test_add_plugins(self, mockopen, mockbox):
+    def test_add_plugins(self, mockopen, mockcritical):
         assert len(self.window.menuImportFlightTrack.actions()) == 2
         assert len(self.window.menuExportActiveFlightTrack.actions()) == 2
         assert len(self.window.import_plugins) == 1
@@ -344,13 +357,13 @@ class Test_MSSSideViewWindow(object):
         assert len(self.window.export_plugins) == 1
         assert len(self.window.menuImportFlightTrack.actions()) == 2
         assert len(self.window.menuExportActiveFlightTrack.actions()) == 2
-        assert mockbox.critical.call_count == 0
+        assert mockcritical.call_count == 0
 
         self.window.remove_plugins()
         with mock.patch("importlib.import_module", new=ExceptionMock(Exception()).raise_exc):
             self.window.add_import_plugins("qt")
             self.window.add_export_plugins("qt")
-            assert mockbox.critical.call_count == 2
+            assert mockcritical.call_count == 2
 
         self.window.remove_plugins()
         with mock.patch("mslib.msui.ms"
@@ -358,7 +371,7 @@ class Test_MSSSideViewWindow(object):
                         new=ExceptionMock(Exception()).raise_exc):
             self.window.add_import_plugins("qt")
             self.window.add_export_plugins("qt")
-            assert mockbox.critical.call_count == 4
+            assert mockcritical.call_count == 4
 
         self.window.remove_plugins()
         assert len(self.window.import_plugins) == 0
@@ -38,9 +38,9 @@ from PyQt5 import QtWidgets, QtTest, QtCore, QtGui
 from mslib.msui import flighttrack as ft
 import mslib.msui.sideview as tv
 from mslib.msui.mpl_qtwidget import _DEFAULT_SETTINGS_SIDEVIEW
-from tests.utils import wait_until_signal
+from tests.utils import wait_until_signal, worker_ports
 
-PORTS = list(range(19000, 19500))
+PORTS = worker_ports(19000)
 
 
 class Test_MSS_SV_OptionsDialog(object):
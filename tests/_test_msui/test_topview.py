@@ -38,9 +38,9 @@ from PyQt5 import QtWidgets, QtCore, QtTest
 from mslib.msui import flighttrack as ft
 from mslib.msui.msui import MSUIMainWindow
 from mslib.msui.mpl_qtwidget import _DEFAULT_SETTINGS_TOPVIEW
-from tests.utils import wait_until_signal
+from tests.utils import wait_until_signal, worker_ports
 
-PORTS = list(range(28000, 28500))
+PORTS = worker_ports(28000)
 
 
 class Test_MSS_TV_MapAppearanceDialog(object):
@@ -37,10 +37,10 @@ from mslib.mswms.mswms import application
 from PyQt5 import QtWidgets, QtCore, QtTest
 from mslib.msui import flighttrack as ft
 import mslib.msui.wms_control as wc
-from tests.utils import wait_until_signal
+from tests.utils import wait_until_signal, worker_ports
 
 
-PORTS = list(range(18000, 18500))
+PORTS = worker_ports(18000)
 
 
 class HSecViewMockup(mock.Mock):
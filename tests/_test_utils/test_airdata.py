@@ -26,11 +26,14 @@
 """
 import os
 import mock
+import pytest
 from PyQt5 import QtWidgets
 from mslib.utils.airdata import download_progress, get_airports, \
     get_available_airspaces, update_airspace, get_airspaces
 from tests.constants import ROOT_DIR
 
+pytestmark = pytest.mark.usefixtures("qt_display", "fail_if_open_message_boxes_left")
+
 
 def _download_progress_airports(path, url):
     """ mock expensive download from external site"""
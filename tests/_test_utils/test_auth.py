@@ -25,11 +25,14 @@
     limitations under the License.
 """
 
+import pytest
 from tests.utils import create_msui_settings_file
 from mslib.utils import auth
 from mslib.utils.config import read_config_file, config_loader
 from mslib.msui import constants
 
+pytestmark = pytest.mark.usefixtures("keyring_reset")
+
 
 def test_keyring():
     username = "something@something.org"
@@ -33,6 +33,8 @@ from mslib.version import __version__
 from mslib.msui.constants import MSUI_SETTINGS
 from tests.utils import create_msui_settings_file
 
+pytestmark = pytest.mark.usefixtures("keyring_reset")
+
 
 class TestMigration:
     """
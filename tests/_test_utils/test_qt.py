@@ -32,6 +32,8 @@ import PyQt5 as pqt
 from mslib.utils.config import config_loader
 from mslib.utils import FatalUserError
 
+pytestmark = pytest.mark.usefixtures("qt_display", "fail_if_open_message_boxes_left")
+
 
 def test_variant():
     for test_val in [-12.2, 2, 0, 12.2]:
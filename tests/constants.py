@@ -45,7 +45,9 @@ CACHED_CONFIG_FILE = None
 SERVER_CONFIG_FILE = "mswms_settings.py"
 MSCOLAB_CONFIG_FILE = "mscolab_settings.py"
 MSCOLAB_AUTH_FILE = "mscolab_auth.py"
-ROOT_FS = TempFS(identifier=f"msui{SHA}")
+# each pytest-xdist worker gets its own root, so provisioning in conftest never races between workers
+XDIST_WORKER = os.environ.get("PYTEST_XDIST_WORKER", "")
+ROOT_FS = TempFS(identifier=f"msui{SHA}{XDIST_WORKER}")
 OSFS_URL = ROOT_FS.geturl("", purpose="fs")
 
 ROOT_DIR = ROOT_FS.getsyspath("")
@@ -55,6 +57,9 @@ if not ROOT_FS.exists("msui/testdata"):
 SERVER_CONFIG_FS = fs.open_fs(fs.path.join(ROOT_DIR, "msui"))
 DATA_FS = fs.open_fs(fs.path.join(ROOT_DIR, "msui/testdata"))
 
+# read by tests/data/mscolab_settings.py, windows needs \\ or / but mixed is terrible. *nix needs /
+os.environ["MSS_TEST_ROOT_DIR"] = ROOT_DIR.replace("\\", "/")
+
 MSUI_CONFIG_PATH = OSFS_URL
 # MSUI_CONFIG_PATH = SERVER_CONFIG_FS.getsyspath("") would use a none osfs path
 os.environ["MSUI_CONFIG_PATH"] = MSUI_CONFIG_PATH
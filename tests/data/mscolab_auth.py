@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+"""
+
+    tests.data.mscolab_auth
+    ~~~~~~~~~~~~~~~~~~~~~~~
+
+    mscolab http authentication used by the tests, conftest.py copies it into the test root
+
+    This file is part of MSS.
+
+    :copyright: Copyright 2016-2023 by the MSS team, see AUTHORS.
+    :license: APACHE-2.0, see LICENSE for details.
+
+    Licensed under the Apache License, Version 2.0 (the "License");
+    you may not use this file except in compliance with the License.
+    You may obtain a copy of the License at
+
+       http://www.apache.org/licenses/LICENSE-2.0
+
+    Unless required by applicable law or agreed to in writing, software
+    distributed under the License is distributed on an "AS IS" BASIS,
+    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+    See the License for the specific language governing permissions and
+    limitations under the License.
+"""
+
+
+class mscolab_auth(object):
+    password = "testvaluepassword"
+    # hashlib.md5(password.encode('utf-8')).hexdigest()
+    allowed_users = [("user", "c263e7657ed58e7e4a327866797398d8")]
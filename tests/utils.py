@@ -25,6 +25,7 @@
     See the License for the specific language governing permissions and
     limitations under the License.
 """
+import os
 import requests
 import time
 import fs
@@ -170,6 +171,18 @@ def mscolab_get_operation_id(app, msc_url, email, password, username, path):
             return p['op_id']
 
 
+def worker_ports(first_port, count=500):
+    """
+    Returns the share of the ports first_port .. first_port + count of this pytest-xdist worker,
+    so that workers running tests of the same module do not start servers on the same ports
+    """
+    worker = os.environ.get("PYTEST_XDIST_WORKER", "gw0")
+    workers = int(os.environ.get("PYTEST_XDIST_WORKER_COUNT", "1"))
+    share = count // workers
+    start = first_port + int(worker[2:]) * share
+    return list(range(start, start + share))
+
+
 def mscolab_check_free_port(all_ports, port):
     _s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
     try: